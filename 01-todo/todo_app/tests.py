@@ -32,6 +32,8 @@ class HomeViewTests(TestCase):
         Task.objects.create(title="Task 1")
         Task.objects.create(title="Task 2")
 
-        response = self.client.get(reverse("home"))
+        # One query for the list, regardless of how many tasks exist
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("home"))
         self.assertContains(response, "Task 1")
         self.assertContains(response, "Task 2")
\ No newline at end of file
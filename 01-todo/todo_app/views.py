@@ -3,8 +3,9 @@ from .models import Task
 
 
 def index(request):
-    tasks = Task.objects.all().order_by("-created_at")
+    # Only load the columns the task list needs
+    tasks = Task.objects.only("title", "is_done", "created_at").order_by("-created_at")
     context = {
         "tasks": tasks,
     }
-    return render(request, "home.html", context)
\ No newline at end of file
+    return render(request, "home.html", context)
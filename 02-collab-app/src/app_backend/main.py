@@ -1,30 +1,52 @@
 from __future__ import annotations
 
-from fastapi import Depends, FastAPI, HTTPException, WebSocket, WebSocketDisconnect, status
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import Depends, FastAPI, HTTPException, Response, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
 
 from .models import (
     RoomCreateRequest,
     RoomCreateResponse,
     RoomListResponse,
+    RoomSocketMessage,
     RoomState,
     RoomUpdateRequest,
 )
+from .realtime import RoomHub
 from .store import RoomsStore
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Build the OpenAPI schema at startup so the first /docs or /openapi.json
+    # request doesn't pay for walking every model.
+    app.openapi()
+    yield
+
+
 app = FastAPI(
     title="Collaborative Code App API",
     version="0.1.0",
     description="Backend API for collaborative code editor",
+    lifespan=lifespan,
 )
 
 # Single in-process store instance
 _rooms_store = RoomsStore()
+_room_hub = RoomHub(_rooms_store)
 
 
 def get_store() -> RoomsStore:
     return _rooms_store
 
 
+def get_hub() -> RoomHub:
+    return _room_hub
+
+
 @app.get("/health", summary="Health check")
 async def health_check() -> dict:
     return {"status": "ok"}
@@ -44,7 +66,7 @@ async def create_room(
         code=payload.code,
         language=payload.language,
     )
-    return RoomCreateResponse(**room.model_dump())
+    return RoomCreateResponse.model_construct(**room.model_dump())
 
 
 @app.get(
@@ -54,9 +76,10 @@ async def create_room(
 )
 async def list_rooms(
     store: RoomsStore = Depends(get_store),
-) -> RoomListResponse:
-    rooms = store.list_rooms()
-    return RoomListResponse(rooms=rooms)
+) -> Response:
+    # Skip re-validating every room through RoomListResponse; response_model
+    # still documents the shape
+    return Response(content=store.list_rooms_json(), media_type="application/json")
 
 
 @app.get(
@@ -67,14 +90,15 @@ async def list_rooms(
 async def get_room(
     room_id: str,
     store: RoomsStore = Depends(get_store),
-) -> RoomState:
-    room = store.get_room(room_id)
-    if room is None:
+) -> Response:
+    payload = store.get_room_json(room_id)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Room '{room_id}' not found",
         )
-    return room
+    # Serve the cached JSON directly; response_model still documents the shape
+    return Response(content=payload, media_type="application/json")
 
 
 @app.patch(
@@ -85,9 +109,11 @@ async def get_room(
 async def update_room(
     room_id: str,
     payload: RoomUpdateRequest,
-    store: RoomsStore = Depends(get_store),
+    hub: RoomHub = Depends(get_hub),
 ) -> RoomState:
-    room = store.update_room(
+    # Goes through the hub so it is ordered after pending WebSocket updates
+    # and reaches WebSocket clients too
+    room = await hub.apply_update(
         room_id,
         code=payload.code,
         language=payload.language,
@@ -104,42 +130,66 @@ async def room_websocket(
     websocket: WebSocket,
     room_id: str,
     store: RoomsStore = Depends(get_store),
+    hub: RoomHub = Depends(get_hub),
 ) -> None:
     """
     Minimal WebSocket endpoint for room updates.
 
     Protocol (JSON messages):
       - {"action": "get"}:
-          -> server responds with current room state
+          -> server responds with current room state (after applying any
+             update still pending for the room)
       - {"action": "update", "code": "...", "language": "..."}:
-          -> server upserts state and broadcasts back updated room to this client
-
-    For now we only echo back to the same client; in a more advanced impl you'd
-    track connected sockets per room and broadcast to all of them.
+          -> server upserts state and broadcasts the updated room to every client
+             connected to the room. Bursts of updates are coalesced into one
+             write and one broadcast.
+      - {"action": "update_and_get", "code": "...", "language": "..."}:
+          -> like "update", but written and broadcast right away; the broadcast
+             is the sender's single reply with the resulting room state.
     """
     await websocket.accept()
+    hub.subscribe(room_id, websocket)
     try:
         while True:
-            data = await websocket.receive_json()
-            action = data.get("action")
+            raw = await websocket.receive_text()
+            try:
+                message = RoomSocketMessage.model_validate_json(raw)
+            except ValidationError:
+                await websocket.send_text(json.dumps({"error": "Invalid message"}))
+                continue
+            action = message.action
 
             if action == "get":
-                room = store.get_room(room_id)
-                if room is None:
+                await hub.flush(room_id)
+                payload = store.get_room_json(room_id)
+                if payload is None:
                     # If room does not exist yet, upsert it with defaults
-                    room = store.upsert_room(room_id)
-                await websocket.send_json(room.model_dump())
+                    store.upsert_room(room_id)
+                    payload = store.get_room_json(room_id)
+                await websocket.send_text(payload)
 
             elif action == "update":
-                code = data.get("code")
-                language = data.get("language")
-                room = store.upsert_room(room_id, code=code, language=language)
-                await websocket.send_json(room.model_dump())
+                hub.submit_update(
+                    room_id,
+                    websocket,
+                    code=message.code,
+                    language=message.language,
+                )
+
+            elif action == "update_and_get":
+                await hub.update_now(
+                    room_id,
+                    websocket,
+                    code=message.code,
+                    language=message.language,
+                )
 
             else:
-                await websocket.send_json(
-                    {"error": f"Unknown action: {action!r}"}
+                await websocket.send_text(
+                    json.dumps({"error": f"Unknown action: {action!r}"})
                 )
     except WebSocketDisconnect:
-        # Client disconnected; nothing special to do in this simple impl
-        return
+        pass
+    finally:
+        # Unsubscribe however the handler exits, not only on a clean disconnect
+        await hub.disconnect(room_id, websocket)
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import functools
 import time
 from typing import Dict, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic.fields import Field
+from pydantic.main import BaseModel
 
 Language = Literal["python", "javascript", "typescript", "sql", "java", "c", "cpp"]
 
@@ -23,7 +25,11 @@ def normalize_language(lang: Optional[str]) -> Language:
     """Normalize an arbitrary language string to one of the supported languages."""
     if not lang:
         return "python"
+    return _normalize_language_cached(lang)
 
+
+@functools.lru_cache(maxsize=64)
+def _normalize_language_cached(lang: str) -> Language:
     lower = lang.lower()
     if lower in SUPPORTED_LANGUAGES:
         return SUPPORTED_LANGUAGES[lower]
@@ -41,9 +47,18 @@ def normalize_language(lang: Optional[str]) -> Language:
 
 
 class RoomState(BaseModel):
+    # The store mutates rooms in place on every update. Values are normalized
+    # before assignment, and assignment isn't validated (pydantic's default).
+
     room_id: str = Field(..., description="Unique room identifier")
     code: str = Field("", description="Shared code in the room")
-    language: Language = Field("python", description="Programming language")
+    # Plain str: values only ever come from normalize_language, which is the
+    # single place the supported set is enforced. The enum stays in the schema.
+    language: str = Field(
+        "python",
+        description="Programming language",
+        json_schema_extra={"enum": list(SUPPORTED_LANGUAGES)},
+    )
     last_updated: float = Field(default_factory=time.time, description="Unix timestamp of last update")
 
 
@@ -61,5 +76,13 @@ class RoomUpdateRequest(BaseModel):
     language: Optional[str] = Field(None, description="New language")
 
 
+class RoomSocketMessage(BaseModel):
+    """Inbound WebSocket frame, parsed straight from the raw JSON text."""
+
+    action: Optional[str] = Field(None, description="Requested action")
+    code: Optional[str] = Field(None, description="New code contents")
+    language: Optional[str] = Field(None, description="New language")
+
+
 class RoomListResponse(BaseModel):
     rooms: Dict[str, RoomState]
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, Optional, Set
+
+from fastapi import WebSocket
+
+from .models import RoomState
+from .store import RoomsStore
+
+
+class RoomHub:
+    """
+    Coordinates live WebSocket traffic per room.
+
+    Every connected socket is subscribed to its room. Updates are coalesced: the
+    first update for a room schedules a flush after `delay` seconds, and updates
+    arriving before then only replace the pending fields (last writer wins). The
+    flush writes the store once, serializes the room once and fans the same
+    payload out to every subscriber.
+    """
+
+    def __init__(self, store: RoomsStore, *, delay: float = 0.03) -> None:
+        self._store = store
+        self._delay = delay
+        self._latest: Dict[str, Dict[str, str]] = {}
+        self._subscribers: Dict[str, Set[WebSocket]] = {}
+        self._pending: Dict[str, asyncio.Task[None]] = {}
+
+    def subscribe(self, room_id: str, websocket: WebSocket) -> None:
+        """Register a socket for room broadcasts."""
+        self._subscribers.setdefault(room_id, set()).add(websocket)
+
+    def submit_update(
+        self,
+        room_id: str,
+        websocket: WebSocket,
+        *,
+        code: Optional[str] = None,
+        language: Optional[str] = None,
+    ) -> None:
+        self._stage(room_id, websocket, code=code, language=language)
+        if room_id not in self._pending:
+            self._pending[room_id] = asyncio.create_task(self._flush_later(room_id))
+
+    async def update_now(
+        self,
+        room_id: str,
+        websocket: WebSocket,
+        *,
+        code: Optional[str] = None,
+        language: Optional[str] = None,
+    ) -> Optional[RoomState]:
+        """Fold an update into any pending one and flush it without waiting."""
+        self._stage(room_id, websocket, code=code, language=language)
+        return await self.flush(room_id)
+
+    async def flush(self, room_id: str) -> Optional[RoomState]:
+        """Write any pending update for the room now and broadcast the result."""
+        task = self._pending.pop(room_id, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+        fields = self._latest.pop(room_id, None)
+        if fields is None:
+            return None
+
+        room = self._store.upsert_room(room_id, **fields)
+        # Serialized once and cached by the store for later reads
+        payload = self._store.get_room_json(room_id)
+        await self._broadcast(room_id, payload)
+        return room
+
+    async def apply_update(
+        self,
+        room_id: str,
+        *,
+        code: Optional[str] = None,
+        language: Optional[str] = None,
+    ) -> Optional[RoomState]:
+        """
+        Write an update that didn't come from a socket (e.g. REST PATCH).
+
+        Any pending socket update is written first, so this later write wins,
+        and the result is broadcast to the room. Returns None if the room
+        doesn't exist.
+        """
+        await self.flush(room_id)
+        room = self._store.update_room(room_id, code=code, language=language)
+        if room is not None:
+            await self._broadcast(room_id, self._store.get_room_json(room_id))
+        return room
+
+    async def disconnect(self, room_id: str, websocket: WebSocket) -> None:
+        """Drop a closed socket, persisting any update left pending for its room."""
+        subscribers = self._subscribers.get(room_id)
+        if subscribers is not None:
+            subscribers.discard(websocket)
+            if not subscribers:
+                del self._subscribers[room_id]
+        if room_id in self._latest:
+            await self.flush(room_id)
+
+    def _stage(
+        self,
+        room_id: str,
+        websocket: WebSocket,
+        *,
+        code: Optional[str],
+        language: Optional[str],
+    ) -> None:
+        fields = self._latest.setdefault(room_id, {})
+        if code is not None:
+            fields["code"] = code
+        if language is not None:
+            fields["language"] = language
+        self.subscribe(room_id, websocket)
+
+    async def _broadcast(self, room_id: str, payload: str) -> None:
+        sends = [
+            websocket.send_text(payload)
+            for websocket in list(self._subscribers.get(room_id, ()))
+        ]
+        # A socket that went away mid-send is cleaned up by its own handler
+        await asyncio.gather(*sends, return_exceptions=True)
+
+    async def _flush_later(self, room_id: str) -> None:
+        try:
+            await asyncio.sleep(self._delay)
+        finally:
+            # Only clear our own entry; flush() may already have replaced it
+            if self._pending.get(room_id) is asyncio.current_task():
+                del self._pending[room_id]
+        await self.flush(room_id)
@@ -1,44 +1,74 @@
 from __future__ import annotations
 
+import json
+import os
 import threading
 import time
-import uuid
-from typing import Dict, Optional
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
 
 from .models import RoomState, normalize_language
 
+# Number of lock shards; must be a power of two
+_LOCK_SHARDS = 64
+
 
 class RoomsStore:
     """
     Thread-safe in-memory storage for room states.
 
+    Writes are serialized per room through a fixed array of shard locks keyed by
+    room id, so updates to unrelated rooms don't contend on one global lock.
+    Single-key dict reads are atomic under the GIL and take no lock.
+
     In real deployments you’d replace this with Redis / DB.
     """
 
     def __init__(self) -> None:
-        self._lock = threading.Lock()
+        self._shard_locks = [threading.Lock() for _ in range(_LOCK_SHARDS)]
         self._rooms: Dict[str, RoomState] = {}
+        self._rooms_view: Mapping[str, RoomState] = MappingProxyType(self._rooms)
+        # Serialized JSON per room, filled on read and dropped on every write
+        self._json_cache: Dict[str, str] = {}
+
+    def _lock_for(self, room_id: str) -> threading.Lock:
+        return self._shard_locks[hash(room_id) & (_LOCK_SHARDS - 1)]
 
     def generate_room_id(self) -> str:
-        return uuid.uuid4().hex[:8]
+        return os.urandom(4).hex()
 
     def create_room(self, *, code: str = "", language: Optional[str] = None) -> RoomState:
-        room_id = self.generate_room_id()
         normalized_lang = normalize_language(language)
-        ts = time.time()
-        room = RoomState(
-            room_id=room_id,
-            code=code,
-            language=normalized_lang,
-            last_updated=ts,
-        )
-        with self._lock:
-            self._rooms[room_id] = room
-        return room
+        while True:
+            room_id = self.generate_room_id()
+            with self._lock_for(room_id):
+                if room_id in self._rooms:
+                    continue
+                # Fields are already normalized here, so skip model validation
+                room = RoomState.model_construct(
+                    room_id=room_id,
+                    code=code,
+                    language=normalized_lang,
+                    last_updated=time.time(),
+                )
+                self._rooms[room_id] = room
+                return room
 
     def get_room(self, room_id: str) -> Optional[RoomState]:
-        with self._lock:
-            return self._rooms.get(room_id)
+        return self._rooms.get(room_id)
+
+    def get_room_json(self, room_id: str) -> Optional[str]:
+        """Return the room serialized to JSON, reusing it until the next write."""
+        cached = self._json_cache.get(room_id)
+        if cached is not None:
+            return cached
+        with self._lock_for(room_id):
+            room = self._rooms.get(room_id)
+            if room is None:
+                return None
+            payload = room.model_dump_json()
+            self._json_cache[room_id] = payload
+            return payload
 
     def upsert_room(
         self,
@@ -47,11 +77,11 @@ class RoomsStore:
         code: Optional[str] = None,
         language: Optional[str] = None,
     ) -> RoomState:
-        with self._lock:
+        with self._lock_for(room_id):
             existing = self._rooms.get(room_id)
             if existing is None:
                 # Create a new room with defaults
-                existing = RoomState(
+                existing = RoomState.model_construct(
                     room_id=room_id,
                     code=code or "",
                     language=normalize_language(language),
@@ -60,14 +90,8 @@ class RoomsStore:
                 self._rooms[room_id] = existing
                 return existing
 
-            data = existing.model_copy()
-            if code is not None:
-                data.code = code
-            if language is not None:
-                data.language = normalize_language(language)
-            data.last_updated = time.time()
-            self._rooms[room_id] = data
-            return data
+            self._apply_update(existing, code=code, language=language)
+            return existing
 
     def update_room(
         self,
@@ -76,20 +100,38 @@ class RoomsStore:
         code: Optional[str] = None,
         language: Optional[str] = None,
     ) -> Optional[RoomState]:
-        with self._lock:
+        with self._lock_for(room_id):
             existing = self._rooms.get(room_id)
             if existing is None:
                 return None
-            data = existing.model_copy()
-            if code is not None:
-                data.code = code
-            if language is not None:
-                data.language = normalize_language(language)
-            data.last_updated = time.time()
-            self._rooms[room_id] = data
-            return data
-
-    def list_rooms(self) -> Dict[str, RoomState]:
-        with self._lock:
-            # Return a shallow copy to avoid external mutation
-            return dict(self._rooms)
+            self._apply_update(existing, code=code, language=language)
+            return existing
+
+    def _apply_update(
+        self,
+        room: RoomState,
+        *,
+        code: Optional[str],
+        language: Optional[str],
+    ) -> None:
+        # Mutate in place: the instance is owned by the store and the caller
+        # holds the room's shard lock
+        if code is not None:
+            room.code = code
+        if language is not None:
+            room.language = normalize_language(language)
+        room.last_updated = time.time()
+        self._json_cache.pop(room.room_id, None)
+
+    def list_rooms(self) -> Mapping[str, RoomState]:
+        # Live read-only view: no per-call copy, callers can't mutate the store
+        return self._rooms_view
+
+    def list_rooms_json(self) -> str:
+        """Return {"rooms": {room_id: room}} as JSON, built from the per-room cache."""
+        parts = []
+        for room_id in list(self._rooms):
+            payload = self.get_room_json(room_id)
+            if payload is not None:
+                parts.append(f"{json.dumps(room_id)}:{payload}")
+        return '{"rooms":{' + ",".join(parts) + "}}"
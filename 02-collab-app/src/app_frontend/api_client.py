@@ -4,10 +4,18 @@ import os
 from typing import Any, Dict, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
 # Backend base URL; configurable via env var
 BACKEND_URL = os.getenv("COLLAB_APP_BACKEND_URL", "http://localhost:8000").rstrip("/")
 
+# Shared session so requests reuse pooled keep-alive connections to the backend.
+# Streamlit serves each browser session from its own thread, hence the larger pool.
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
 
 def _url(path: str) -> str:
     if not path.startswith("/"):
@@ -15,12 +23,21 @@ def _url(path: str) -> str:
     return BACKEND_URL + path
 
 
+def check_backend_health() -> bool:
+    """Return True if the backend /health endpoint responds with 200."""
+    try:
+        resp = _session.get(_url("/health"), timeout=2)
+        return resp.status_code == 200
+    except requests.RequestException:
+        return False
+
+
 def create_room(code: str = "", language: str = "python") -> Dict[str, Any]:
     """
     Create a new room via the backend. Returns the JSON room dict:
     {room_id, code, language, last_updated}
     """
-    resp = requests.post(
+    resp = _session.post(
         _url("/rooms"),
         json={"code": code, "language": language},
         timeout=5,
@@ -34,7 +51,7 @@ def get_room(room_id: str) -> Optional[Dict[str, Any]]:
     Fetch room state. Returns None if the room does not exist (404).
     Raises for other HTTP errors.
     """
-    resp = requests.get(_url(f"/rooms/{room_id}"), timeout=5)
+    resp = _session.get(_url(f"/rooms/{room_id}"), timeout=5)
     if resp.status_code == 404:
         return None
     resp.raise_for_status()
@@ -57,7 +74,7 @@ def update_room(
     if language is not None:
         payload["language"] = language
 
-    resp = requests.patch(
+    resp = _session.patch(
         _url(f"/rooms/{room_id}"),
         json=payload,
         timeout=5,
@@ -2,45 +2,105 @@ from __future__ import annotations
 
 import html
 import json
+import sys
 import threading
 import time
 import uuid
 from dataclasses import dataclass, field
-from typing import Dict, List, Literal, Optional
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Literal, Mapping, Optional, Tuple
+
+try:
+    # Optional: vectorized string escaping for large code buffers
+    import orjson
+except ImportError:
+    orjson = None
 
 Language = Literal["python", "javascript", "typescript", "sql", "java", "c", "cpp"]
 
-SUPPORTED_LANGUAGES: Dict[str, str] = {
-    "Python": "python",
-    "JavaScript": "javascript",
-    "TypeScript": "typescript",
-    "SQL": "sql",
-    "Java": "java",
-    "C": "c",
-    "C++": "cpp",
+# Internal ids are interned so every room shares one string object per language
+_SUPPORTED_LANGUAGES_RAW: Dict[str, str] = {
+    display: sys.intern(internal)
+    for display, internal in {
+        "Python": "python",
+        "JavaScript": "javascript",
+        "TypeScript": "typescript",
+        "SQL": "sql",
+        "Java": "java",
+        "C": "c",
+        "C++": "cpp",
+    }.items()
 }
+# Read-only view: display name -> internal id
+SUPPORTED_LANGUAGES: Mapping[str, str] = MappingProxyType(_SUPPORTED_LANGUAGES_RAW)
+SUPPORTED_INTERNAL: FrozenSet[str] = frozenset(_SUPPORTED_LANGUAGES_RAW.values())
+
+# Reverse lookups, built once: internal id -> display name, and any lowercased
+# display name or internal id -> internal id
+INTERNAL_TO_DISPLAY: Dict[str, str] = {v: k for k, v in SUPPORTED_LANGUAGES.items()}
+_LOWER_TO_INTERNAL: Dict[str, str] = {
+    k.lower(): v for k, v in SUPPORTED_LANGUAGES.items()
+} | {v.lower(): v for v in SUPPORTED_LANGUAGES.values()}
+
+# Language picker options and each option's position, for the selectbox
+LANG_DISPLAY_OPTIONS: Tuple[str, ...] = tuple(SUPPORTED_LANGUAGES)
+LANG_DISPLAY_INDEX: Dict[str, int] = {d: i for i, d in enumerate(LANG_DISPLAY_OPTIONS)}
 
 
-@dataclass
+@dataclass(slots=True)
 class RoomState:
     """State shared by all users connected to the same room."""
     code: str = ""
     language: Language = "python"
-    last_updated: float = field(default_factory=time.time)
+    # Monotonic nanoseconds: a version counter for change checks, not a wall-clock time
+    last_updated: int = field(default_factory=time.monotonic_ns)
+    # Guards the code/language/last_updated triple during updates
+    _lock: threading.RLock = field(
+        default_factory=threading.RLock, init=False, repr=False, compare=False
+    )
+
+
+@dataclass(slots=True)
+class EditorSessionState:
+    """
+    Per-session state of the Streamlit editor page, kept under a single
+    `st.session_state` key instead of one key per field.
+    """
+    code_editor: str = ""
+    # Backend `last_updated` of the code currently in the editor
+    code_version: float = 0.0
+    last_change_origin: Literal["local", "remote"] = "remote"
+    last_sent_code_hash: Optional[bytes] = None
+    last_sent_language: Optional[str] = None
+    # Adaptive polling bookkeeping
+    last_seen_version: Optional[float] = None
+    poll_interval: float = 0.0
+    next_poll_at: float = 0.0
+    # Last room JSON fetched from the backend
+    room: Dict[str, Any] = field(default_factory=dict)
+    # Code last run in the JS sandbox; its output stays up until the code changes
+    last_run_code: Optional[str] = None
 
 
 class RoomsStore:
-    """In-memory store for collaborative rooms (server-side global)."""
+    """
+    In-memory store for collaborative rooms (server-side global).
+
+    There is no store-wide lock: single dict operations are atomic under the
+    GIL, and each room carries its own lock for updates, so work on one room
+    never blocks another.
+    """
 
     def __init__(self) -> None:
-        self._lock = threading.Lock()
         self._rooms: Dict[str, RoomState] = {}
 
     def get_or_create(self, room_id: str) -> RoomState:
-        with self._lock:
-            if room_id not in self._rooms:
-                self._rooms[room_id] = RoomState()
-            return self._rooms[room_id]
+        room = self._rooms.get(room_id)
+        if room is None:
+            # setdefault is atomic, so concurrent creators end up sharing one room
+            room = self._rooms.setdefault(room_id, RoomState())
+        return room
 
     def update(
         self,
@@ -49,18 +109,17 @@ class RoomsStore:
         code: Optional[str] = None,
         language: Optional[Language] = None,
     ) -> RoomState:
-        with self._lock:
-            room = self._rooms.setdefault(room_id, RoomState())
+        room = self.get_or_create(room_id)
+        with room._lock:
             if code is not None:
                 room.code = code
             if language is not None:
                 room.language = language
-            room.last_updated = time.time()
-            return room
+            room.last_updated = time.monotonic_ns()
+        return room
 
-    def list_rooms(self) -> List[str]:
-        with self._lock:
-            return list(self._rooms.keys())
+    def list_rooms(self) -> Tuple[str, ...]:
+        return tuple(self._rooms)
 
 
 # Single global store used by all Streamlit sessions
@@ -79,12 +138,43 @@ def normalize_language(lang_key: str) -> Language:
     """
     if not lang_key:
         return "python"
-    lower = lang_key.lower()
-    # Try display names and internal ids
-    for display, internal in SUPPORTED_LANGUAGES.items():
-        if lower == display.lower() or lower == internal.lower():
-            return internal  # type: ignore[return-value]
-    return "python"
+    if lang_key in SUPPORTED_INTERNAL:
+        # Hand back the interned id, not the caller's equal string
+        return _LOWER_TO_INTERNAL[lang_key]  # type: ignore[return-value]
+    # Display names and internal ids both map to the internal id
+    return _LOWER_TO_INTERNAL.get(lang_key.lower(), "python")  # type: ignore[return-value]
+
+
+# The sandbox document is constant: user code is posted into it once it has
+# loaded, so the srcdoc-escaped shell is built once at import.
+_SANDBOX_HTML = Path(__file__).with_name("sandbox.html").read_text(encoding="utf-8")
+_ESCAPED_SANDBOX_HTML = html.escape(_SANDBOX_HTML.strip(), quote=True)
+
+
+# Everything around the posted code is constant, so the iframe markup is
+# assembled once and only the code slot is filled in per call
+_IFRAME_HEAD = (
+    "<iframe\n"
+    '  sandbox="allow-scripts"\n'
+    '  style="width: 100%; height: 100%; border: none;"\n'
+    f'  srcdoc="{_ESCAPED_SANDBOX_HTML}"\n'
+    '  onload="this.contentWindow.postMessage('
+)
+_IFRAME_TAIL = ", '*')\"\n></iframe>"
+
+
+def _escape_attribute(value: str) -> str:
+    """
+    Escape a value for a double-quoted HTML attribute.
+
+    Only `&` and `"` are significant there, so this skips the extra passes
+    `html.escape` makes for `<`, `>` and `'`.
+    """
+    if "&" in value:
+        value = value.replace("&", "&amp;")
+    if '"' in value:
+        value = value.replace('"', "&quot;")
+    return value
 
 
 def build_js_execution_iframe(code: str) -> str:
@@ -92,53 +182,13 @@ def build_js_execution_iframe(code: str) -> str:
     Build a sandboxed <iframe> HTML that executes JavaScript code safely
     in the browser. The code runs in an isolated iframe with `sandbox="allow-scripts"`.
     Output (console.log and errors) is captured into a <pre> element.
+
+    The iframe document comes from `sandbox.html`; the code is handed to it
+    with `postMessage` from the iframe's onload handler.
     """
     # Use JSON to safely embed the user code as a JS string
-    code_json = json.dumps(code)
-
-    inner_html = f"""
-<!doctype html>
-<html>
-  <body>
-    <pre id="output" style="white-space: pre-wrap; font-family: monospace;"></pre>
-    <script>
-      const userCode = {code_json};
-      const output = document.getElementById('output');
-
-      function log(msg) {{
-        output.textContent += msg + "\\n";
-      }}
-
-      (function() {{
-        const originalLog = console.log;
-        console.log = function(...args) {{
-          log(args.join(" "));
-          originalLog.apply(console, args);
-        }};
-        try {{
-          // Execute user code in this sandboxed iframe context
-          // eslint-disable-next-line no-eval
-          eval(userCode);
-        }} catch (err) {{
-          log("Error: " + err.toString());
-        }} finally {{
-          console.log = originalLog;
-        }}
-      }})();
-    </script>
-  </body>
-</html>
-    """.strip()
-
-    # srcdoc must be HTML-escaped
-    escaped_inner = html.escape(inner_html, quote=True)
-
-    iframe_html = f"""
-<iframe
-  sandbox="allow-scripts"
-  style="width: 100%; height: 100%; border: none;"
-  srcdoc="{escaped_inner}"
-></iframe>
-    """.strip()
-
-    return iframe_html
+    if orjson is not None:
+        code_json = orjson.dumps(code).decode()
+    else:
+        code_json = json.dumps(code)
+    return _IFRAME_HEAD + _escape_attribute(code_json) + _IFRAME_TAIL
@@ -1,20 +1,30 @@
 from __future__ import annotations
 
+import hashlib
 import time
-from typing import Any, Dict, Tuple
+from typing import Any, Callable, Dict, Optional, Tuple
 
 import requests
 import streamlit as st
-import streamlit.components.v1 as components
-from streamlit_ace import st_ace
 
-from api_client import create_room, get_room, update_room, BACKEND_URL
+from api_client import check_backend_health, create_room, get_room, update_room, BACKEND_URL
 from collab_state import (
-    SUPPORTED_LANGUAGES,
+    INTERNAL_TO_DISPLAY,
+    EditorSessionState,
+    LANG_DISPLAY_INDEX,
+    LANG_DISPLAY_OPTIONS,
     build_js_execution_iframe,
     normalize_language,
 )
 
+# The sandbox HTML only depends on the code, so reruns reuse it
+cached_js_execution_iframe = st.cache_data(max_entries=64)(build_js_execution_iframe)
+
+# Live-update polling bounds (seconds): poll fast right after activity,
+# back off exponentially while the room is idle
+MIN_POLL_INTERVAL = 0.25
+MAX_POLL_INTERVAL = 5.0
+
 
 def _extract_room_id(raw: Any) -> str | None:
     """
@@ -30,11 +40,20 @@ def _extract_room_id(raw: Any) -> str | None:
     return str(raw)
 
 
-def get_or_create_room_id_via_backend() -> str:
+def get_editor_state() -> EditorSessionState:
+    """Return this session's editor state, creating it on the first run."""
+    return st.session_state.setdefault("editor_state", EditorSessionState())
+
+
+def get_or_create_room_id_via_backend() -> Tuple[str, Optional[Dict[str, Any]]]:
     """
     Get the room id from query params.
     If missing or pointing to a non-existent room, create a new room via backend
     and update the URL.
+
+    Returns (room_id, room_json). room_json is the room as fetched or created
+    here, so the caller doesn't need to ask the backend again; it is None when
+    the backend couldn't be reached.
     """
     params = st.query_params
     room_param = _extract_room_id(params.get("room"))
@@ -45,10 +64,10 @@ def get_or_create_room_id_via_backend() -> str:
             room = get_room(room_param)
         except requests.RequestException as exc:
             st.error(f"Failed to contact backend when checking room: {exc}")
-            return room_param
+            return room_param, None
 
         if room is not None:
-            return room_param
+            return room_param, room
 
         # Room ID is present but backend doesn't know it -> fall through and create new
 
@@ -58,30 +77,39 @@ def get_or_create_room_id_via_backend() -> str:
     except requests.RequestException as exc:
         st.error(f"Failed to create room via backend: {exc}")
         # Fallback: synthetic ID, but won't exist in backend
-        return "fallback-room"
+        return "fallback-room", None
 
     new_room_id = new_room["room_id"]
     params["room"] = new_room_id  # updates URL
-    return new_room_id
+    return new_room_id, new_room
 
 
-def sync_room_into_session(room_id: str) -> Tuple[Dict[str, Any], str]:
+def sync_room_into_session(
+    room_id: str,
+    prefetched: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, Any], str]:
     """
     Synchronize backend room state with the current session_state.
 
+    If `prefetched` room JSON was already fetched during this rerun it is used
+    as-is instead of requesting the room again.
+
     Returns (room_json, current_code_in_editor).
     """
-    try:
-        room = get_room(room_id)
-    except requests.RequestException as exc:
-        st.error(f"Failed to fetch room from backend: {exc}")
-        # Minimal fallback room
-        room = {
-            "room_id": room_id,
-            "code": st.session_state.get("code_editor", ""),
-            "language": "python",
-            "last_updated": st.session_state.get("code_version", time.time()),
-        }
+    ess = get_editor_state()
+    room: Optional[Dict[str, Any]] = prefetched
+    if room is None:
+        try:
+            room = get_room(room_id)
+        except requests.RequestException as exc:
+            st.error(f"Failed to fetch room from backend: {exc}")
+            # Minimal fallback room
+            room = {
+                "room_id": room_id,
+                "code": ess.code_editor,
+                "language": "python",
+                "last_updated": ess.code_version or time.time(),
+            }
 
     if room is None:
         # If room disappeared, create a new one
@@ -96,29 +124,170 @@ def sync_room_into_session(room_id: str) -> Tuple[Dict[str, Any], str]:
                 "last_updated": time.time(),
             }
 
-    # Initialize local session state if first time
-    if "code_editor" not in st.session_state:
-        st.session_state["code_editor"] = room["code"]
-        st.session_state["code_version"] = room["last_updated"]
-        st.session_state["last_change_origin"] = "remote"
+    # Remote update detection. A fresh session starts at version 0 with a
+    # "remote" origin, so its first sync loads the room's code.
+    if room["last_updated"] > ess.code_version:
+        if ess.last_change_origin != "local":
+            ess.code_editor = room["code"]
+            ess.code_version = room["last_updated"]
+        ess.last_change_origin = "remote"
 
-    # Remote update detection
-    if room["last_updated"] > st.session_state.get("code_version", 0.0):
-        if st.session_state.get("last_change_origin") != "local":
-            st.session_state["code_editor"] = room["code"]
-            st.session_state["code_version"] = room["last_updated"]
-        st.session_state["last_change_origin"] = "remote"
+    return room, ess.code_editor
 
-    current_code = st.session_state["code_editor"]
-    return room, current_code
 
-def check_backend_health() -> bool:
-    """Return True if the backend /health endpoint responds with 200."""
-    try:
-        resp = requests.get(f"{BACKEND_URL}/health", timeout=2)
-        return resp.status_code == 200
-    except requests.RequestException:
-        return False
+@st.cache_resource
+def get_ace_editor() -> Callable[..., Any]:
+    """Import the Ace editor component once per process, not on every rerun."""
+    from streamlit_ace import st_ace
+
+    return st_ace
+
+
+def code_fingerprint(code: str) -> bytes:
+    """Short, process-independent digest of the editor contents."""
+    return hashlib.blake2b(code.encode(), digest_size=8).digest()
+
+
+def next_poll_interval(room_version: float) -> float:
+    """
+    Return how long to wait before the next poll.
+
+    Resets to the minimum whenever the room version moved since the previous
+    poll, otherwise doubles the previous interval up to the maximum.
+    """
+    ess = get_editor_state()
+    if room_version != ess.last_seen_version:
+        interval = MIN_POLL_INTERVAL
+    else:
+        interval = min(ess.poll_interval * 2, MAX_POLL_INTERVAL)
+    ess.last_seen_version = room_version
+    ess.poll_interval = interval
+    return interval
+
+
+def room_version(room: Dict[str, Any]) -> float:
+    """Latest known change to the room; local edits count as activity too."""
+    return max(room["last_updated"], get_editor_state().code_version)
+
+
+def schedule_next_poll(interval: float) -> None:
+    """
+    Hold the editor panel's next backend fetch until its next timed rerun.
+
+    The panel reruns every `interval` seconds; allowing half an interval of
+    slack keeps a rerun that fires slightly early from skipping a whole poll.
+    """
+    get_editor_state().next_poll_at = time.monotonic() + interval / 2
+
+
+def render_editor_panel(
+    room_id: str,
+    selected_lang: str,
+    room_language: str,
+    poll_every: Optional[float],
+) -> None:
+    """
+    Editor, preview, execution and "last updated" label for the room.
+
+    Runs as a fragment. With live updates on it is mounted to rerun every
+    `poll_every` seconds and fetches the room on those reruns; widget reruns in
+    between reuse the last fetched room. A fragment's interval is fixed once
+    mounted, so when the backoff moves to a new interval the page is rerun to
+    remount the panel at that interval.
+    """
+    ess = get_editor_state()
+    room = ess.room
+    if poll_every is not None and time.monotonic() >= ess.next_poll_at:
+        try:
+            polled = get_room(room_id)
+        except requests.RequestException as exc:
+            st.error(f"Failed to fetch room from backend: {exc}")
+            polled = room
+        if polled is None:
+            # The room is gone (e.g. the backend restarted). Only the full run
+            # may create a replacement, since it also points ?room= at it.
+            st.rerun(scope="app")
+        room, _ = sync_room_into_session(room_id, prefetched=polled)
+        if room["language"] != room_language:
+            # The language selector lives outside this fragment
+            st.rerun(scope="app")
+        ess.room = room
+        schedule_next_poll(next_poll_interval(room_version(room)))
+
+    cols = st.columns([1, 3])
+    with cols[0]:
+        if st.button("🧹 Clear editor", help="Remove all code and sync to backend"):
+            ess.code_editor = ""
+            ess.last_change_origin = "local"
+            try:
+                updated = update_room(room["room_id"], code="", language=selected_lang)
+                ess.code_version = updated["last_updated"]
+                ess.last_sent_code_hash = code_fingerprint("")
+                schedule_next_poll(next_poll_interval(room_version(room)))
+            except requests.RequestException as exc:
+                st.error(f"Failed to clear editor via backend: {exc}")
+
+    st_ace = get_ace_editor()
+    new_code = st_ace(
+        value=ess.code_editor,
+        language=selected_lang,
+        theme="xcode",
+        wrap=True,
+    )
+
+    # Change detection logic. The editor can hand back text we already sent
+    # (e.g. right after a remote update replaced it), so skip those PATCHes.
+    if new_code != ess.code_editor:
+        new_code_hash = code_fingerprint(new_code)
+        if new_code_hash != ess.last_sent_code_hash:
+            ess.code_editor = new_code
+            ess.last_change_origin = "local"
+
+            try:
+                updated = update_room(
+                    room["room_id"],
+                    code=new_code,
+                    language=selected_lang,
+                )
+                ess.code_version = updated["last_updated"]
+                ess.last_sent_code_hash = new_code_hash
+                schedule_next_poll(next_poll_interval(room_version(room)))
+            except requests.RequestException as exc:
+                st.error(f"Failed to update code in backend: {exc}")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.write("#### Syntax-highlighted preview")
+        st.code(ess.code_editor, language=selected_lang)
+
+    with col2:
+        st.write("#### In-browser execution")
+
+        if selected_lang == "javascript":
+            if st.button("▶ Run JavaScript in sandbox"):
+                ess.last_run_code = ess.code_editor
+            # The button is only true on the click's rerun; keep showing the
+            # sandbox across panel reruns until the code changes
+            if ess.last_run_code == ess.code_editor:
+                # Only needed once a run is requested, so imported lazily
+                import streamlit.components.v1 as components
+
+                iframe_html = cached_js_execution_iframe(ess.code_editor)
+                components.html(iframe_html, height=300)
+        else:
+            st.info(
+                f"Execution is only implemented for JavaScript at the moment. "
+                f"Selected language: **{selected_lang}**"
+            )
+
+    st.caption(
+        f"Last updated at: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(room['last_updated']))}"
+    )
+
+    if poll_every is not None and ess.poll_interval != poll_every:
+        st.rerun(scope="app")
+
 
 def main() -> None:
     st.set_page_config(
@@ -136,10 +305,11 @@ def main() -> None:
         st.stop()
 
     # 1) Determine room id using backend as source of truth
-    room_id = get_or_create_room_id_via_backend()
+    room_id, prefetched_room = get_or_create_room_id_via_backend()
 
     # 2) Pull room state from backend and sync into session_state
-    room, current_code = sync_room_into_session(room_id)
+    room, current_code = sync_room_into_session(room_id, prefetched=prefetched_room)
+    ess = get_editor_state()
 
     with st.sidebar:
         st.subheader("Session")
@@ -150,23 +320,19 @@ def main() -> None:
 
         st.subheader("Settings")
 
-        lang_display_options = list(SUPPORTED_LANGUAGES.keys())
         # Find display label for current language
-        current_display = next(
-            (d for d, internal in SUPPORTED_LANGUAGES.items() if internal == room["language"]),
-            "Python",
-        )
+        current_display = INTERNAL_TO_DISPLAY.get(room["language"], "Python")
         selected_display = st.selectbox(
             "Language",
-            lang_display_options,
-            index=lang_display_options.index(current_display),
+            LANG_DISPLAY_OPTIONS,
+            index=LANG_DISPLAY_INDEX[current_display],
         )
         selected_lang = normalize_language(selected_display)
 
         live_updates = st.checkbox(
             "Live updates (auto-refresh)",
             value=True,
-            help="When enabled, this page will poll for updates every second.",
+            help="When enabled, this page polls for updates, more often while the room is active.",
             key="live_updates",
         )
 
@@ -182,80 +348,36 @@ def main() -> None:
             """
         )
 
-    # If language changed, persist to backend
-    if selected_lang != room["language"]:
+    # If language changed, persist to backend (once: a stale `room` must not
+    # re-send the same language on every rerun)
+    if selected_lang == room["language"]:
+        ess.last_sent_language = None
+    elif selected_lang != ess.last_sent_language:
         try:
             updated = update_room(room["room_id"], language=selected_lang)
             room = updated
+            ess.last_sent_language = selected_lang
         except requests.RequestException as exc:
             st.error(f"Failed to update language in backend: {exc}")
 
+    # The editor panel fetches the room from here on, at the current backoff
+    # interval; this run's fetch covers the first one
+    ess.room = room
+    if not ess.poll_interval:
+        ess.poll_interval = MIN_POLL_INTERVAL
+    poll_every = ess.poll_interval if live_updates else None
+    if poll_every is not None:
+        schedule_next_poll(poll_every)
+
     st.write("### Shared code editor")
     st.info(
         "Changes are shared when you **leave the editor** (click outside) "
-        "or press **Ctrl+Enter**. Other clients will see updates within about a second."
-    )
-
-    cols = st.columns([1, 3])
-    with cols[0]:
-        if st.button("🧹 Clear editor", help="Remove all code and sync to backend"):
-            st.session_state["code_editor"] = ""
-            st.session_state["last_change_origin"] = "local"
-            try:
-                updated = update_room(room["room_id"], code="", language=selected_lang)
-                st.session_state["code_version"] = updated["last_updated"]
-            except requests.RequestException as exc:
-                st.error(f"Failed to clear editor via backend: {exc}")
-
-    new_code = st_ace(
-        value=st.session_state.get("code_editor", ""),
-        language=selected_lang,
-        theme="xcode",
-        wrap=True,
-    )
-
-    # Change detection logic
-    if new_code != st.session_state.get("code_editor", ""):
-        st.session_state["code_editor"] = new_code
-        st.session_state["last_change_origin"] = "local"
-
-        try:
-            updated = update_room(
-                room["room_id"],
-                code=new_code,
-                language=selected_lang,
-            )
-            st.session_state["code_version"] = updated["last_updated"]
-        except requests.RequestException as exc:
-            st.error(f"Failed to update code in backend: {exc}")
-
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.write("#### Syntax-highlighted preview")
-        st.code(st.session_state["code_editor"], language=selected_lang)
-
-    with col2:
-        st.write("#### In-browser execution")
-
-        if selected_lang == "javascript":
-            if st.button("▶ Run JavaScript in sandbox"):
-                iframe_html = build_js_execution_iframe(st.session_state["code_editor"])
-                components.html(iframe_html, height=300)
-        else:
-            st.info(
-                f"Execution is only implemented for JavaScript at the moment. "
-                f"Selected language: **{selected_lang}**"
-            )
-
-    st.caption(
-        f"Last updated at: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(room['last_updated']))}"
+        "or press **Ctrl+Enter**. Other clients will see updates within a few seconds."
     )
 
-    # 3) Polling for near real-time updates (still works with backend)
-    if st.session_state.get("live_updates"):
-        time.sleep(1.0)
-        st.rerun()
+    # Only the editor panel reruns while polling; the page around it stays put
+    panel = st.fragment(render_editor_panel, run_every=poll_every)
+    panel(room_id, selected_lang, room["language"], poll_every)
 
 
 if __name__ == "__main__":
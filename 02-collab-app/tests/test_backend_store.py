@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import json
 import time
 
+import pytest
+
 from src.app_backend.models import normalize_language
 from src.app_backend.store import RoomsStore
 
@@ -76,6 +79,18 @@ def test_upsert_room_creates_and_updates() -> None:
     assert updated.last_updated > before_ts
 
 
+def test_updates_mutate_the_stored_room_in_place() -> None:
+    store = RoomsStore()
+    room = store.create_room(code="a")
+    room_id = room.room_id
+
+    assert store.update_room(room_id, code="x") is room
+    assert store.upsert_room(room_id, language="javascript") is room
+    assert store.get_room(room_id) is room
+    assert room.code == "x"
+    assert room.language == "javascript"
+
+
 def test_list_rooms_includes_created_rooms() -> None:
     store = RoomsStore()
     r1 = store.create_room(code="1")
@@ -86,3 +101,55 @@ def test_list_rooms_includes_created_rooms() -> None:
     assert r2.room_id in rooms
     assert rooms[r1.room_id].code == "1"
     assert rooms[r2.room_id].code == "2"
+
+
+def test_list_rooms_is_read_only() -> None:
+    store = RoomsStore()
+    room = store.create_room(code="1")
+
+    rooms = store.list_rooms()
+    with pytest.raises(TypeError):
+        rooms["other"] = room  # type: ignore[index]
+
+
+def test_create_room_retries_on_id_collision(monkeypatch: pytest.MonkeyPatch) -> None:
+    store = RoomsStore()
+    store.upsert_room("deadbeef", code="taken")
+
+    ids = iter(["deadbeef", "cafebabe"])
+    monkeypatch.setattr(store, "generate_room_id", lambda: next(ids))
+
+    room = store.create_room(code="new")
+    assert room.room_id == "cafebabe"
+    assert store.get_room("deadbeef").code == "taken"  # type: ignore[union-attr]
+
+
+def test_get_room_json_is_refreshed_after_update() -> None:
+    store = RoomsStore()
+    room = store.create_room(code="a")
+
+    first = store.get_room_json(room.room_id)
+    assert first is not None
+    assert json.loads(first)["code"] == "a"
+    assert store.get_room_json(room.room_id) is first  # served from cache
+
+    store.update_room(room.room_id, code="b")
+    second = store.get_room_json(room.room_id)
+    assert second is not None
+    assert json.loads(second)["code"] == "b"
+
+    assert store.get_room_json("doesnotexist") is None
+
+
+def test_list_rooms_json_matches_list_rooms() -> None:
+    store = RoomsStore()
+    r1 = store.create_room(code='say "hi"')
+    r2 = store.create_room(code="2", language="sql")
+
+    data = json.loads(store.list_rooms_json())
+    assert data == {
+        "rooms": {rid: room.model_dump() for rid, room in store.list_rooms().items()}
+    }
+    assert data["rooms"][r1.room_id]["code"] == 'say "hi"'
+    assert data["rooms"][r2.room_id]["language"] == "sql"
+    assert json.loads(RoomsStore().list_rooms_json()) == {"rooms": {}}
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import time
+
+import pytest
 from fastapi.testclient import TestClient
 
-from src.app_backend.main import app
+from src.app_backend.main import app, get_hub, get_store
+from src.app_backend.realtime import RoomHub
+from src.app_backend.store import RoomsStore
 
 client = TestClient(app)
 
@@ -11,18 +16,137 @@ def test_websocket_get_and_update_room() -> None:
     room_id = "ws-test-room"
 
     with client.websocket_connect(f"/ws/rooms/{room_id}") as websocket:
-        # 1) Update room via websocket
+        # Pipeline both requests; replies come back in request order
         websocket.send_json(
             {"action": "update", "code": "print('hi')", "language": "python"}
         )
+        websocket.send_json({"action": "get"})
+
+        # 1) Update room via websocket
         updated = websocket.receive_json()
         assert updated["room_id"] == room_id
         assert updated["code"] == "print('hi')"
         assert updated["language"] == "python"
 
         # 2) Get current room state via websocket
-        websocket.send_json({"action": "get"})
         current = websocket.receive_json()
         assert current["room_id"] == room_id
         assert current["code"] == "print('hi')"
         assert current["language"] == "python"
+
+
+def test_websocket_update_and_get_replies_once() -> None:
+    room_id = "ws-update-and-get-room"
+
+    with client.websocket_connect(f"/ws/rooms/{room_id}") as websocket:
+        websocket.send_json({"action": "update", "code": "draft"})
+        websocket.send_json(
+            {"action": "update_and_get", "code": "final", "language": "javascript"}
+        )
+
+        # The pending update is folded in, so only one state frame comes back
+        updated = websocket.receive_json()
+        assert updated["room_id"] == room_id
+        assert updated["code"] == "final"
+        assert updated["language"] == "javascript"
+
+        websocket.send_json({"action": "get"})
+        assert websocket.receive_json() == updated
+
+
+def test_websocket_rejects_malformed_message() -> None:
+    with client.websocket_connect("/ws/rooms/ws-malformed-room") as websocket:
+        websocket.send_text("not json")
+        reply = websocket.receive_json()
+        assert reply == {"error": "Invalid message"}
+
+        # The connection stays usable after a bad frame
+        websocket.send_json({"action": "get"})
+        current = websocket.receive_json()
+        assert current["room_id"] == "ws-malformed-room"
+
+
+def test_websocket_coalesces_update_bursts() -> None:
+    room_id = "ws-burst-room"
+
+    with client.websocket_connect(f"/ws/rooms/{room_id}") as websocket:
+        websocket.send_json({"action": "update", "code": "a", "language": "javascript"})
+        websocket.send_json({"action": "update", "code": "b"})
+
+        # Both updates are folded into one write and one reply
+        updated = websocket.receive_json()
+        assert updated["code"] == "b"
+        assert updated["language"] == "javascript"
+
+        websocket.send_json({"action": "get"})
+        current = websocket.receive_json()
+        assert current["code"] == "b"
+        assert current["last_updated"] == updated["last_updated"]
+
+
+def test_websocket_update_is_broadcast_to_all_clients_in_room() -> None:
+    room_id = "ws-broadcast-room"
+
+    # Entering the client shares one event loop between both connections
+    with TestClient(app) as shared_client:
+        with shared_client.websocket_connect(f"/ws/rooms/{room_id}") as writer:
+            with shared_client.websocket_connect(f"/ws/rooms/{room_id}") as reader:
+                # Make sure the reader is subscribed before the write lands
+                reader.send_json({"action": "get"})
+                reader.receive_json()
+
+                writer.send_json({"action": "update", "code": "shared"})
+                assert writer.receive_json()["code"] == "shared"
+                assert reader.receive_json()["code"] == "shared"
+
+
+def test_rest_patch_lands_after_pending_websocket_update() -> None:
+    # A long coalescing delay keeps the socket update pending during the PATCH
+    hub = RoomHub(get_store(), delay=5.0)
+    app.dependency_overrides[get_hub] = lambda: hub
+    try:
+        with TestClient(app) as shared_client:
+            room_id = shared_client.post("/rooms", json={}).json()["room_id"]
+            with shared_client.websocket_connect(f"/ws/rooms/{room_id}") as websocket:
+                websocket.send_json({"action": "update", "code": "from socket"})
+                # Wait until the hub has staged the frame before sending the PATCH
+                deadline = time.monotonic() + 2.0
+                while room_id not in hub._latest:
+                    assert time.monotonic() < deadline, "socket update was never staged"
+                    time.sleep(0.005)
+
+                resp = shared_client.patch(f"/rooms/{room_id}", json={"code": "from rest"})
+                assert resp.status_code == 200
+                assert resp.json()["code"] == "from rest"
+
+                websocket.send_json({"action": "get"})
+
+                # The pending update is written first, then the PATCH is
+                # broadcast, and the PATCH is what the room ends up with
+                assert websocket.receive_json()["code"] == "from socket"
+                assert websocket.receive_json()["code"] == "from rest"
+                assert websocket.receive_json()["code"] == "from rest"
+    finally:
+        app.dependency_overrides.pop(get_hub, None)
+
+
+class _BrokenStore(RoomsStore):
+    def get_room_json(self, room_id: str) -> str:
+        raise RuntimeError("store unavailable")
+
+
+def test_websocket_unsubscribes_when_handler_fails() -> None:
+    store = _BrokenStore()
+    hub = RoomHub(store)
+    app.dependency_overrides[get_store] = lambda: store
+    app.dependency_overrides[get_hub] = lambda: hub
+    try:
+        with pytest.raises(RuntimeError):
+            with client.websocket_connect("/ws/rooms/ws-broken-room") as websocket:
+                websocket.send_json({"action": "get"})
+                websocket.receive_json()
+
+        assert hub._subscribers == {}
+    finally:
+        app.dependency_overrides.pop(get_store, None)
+        app.dependency_overrides.pop(get_hub, None)
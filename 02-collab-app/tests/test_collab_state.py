@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-import html
+import re
 import time
 
+import pytest
+
 from src.app_frontend.collab_state import (
     GLOBAL_ROOMS_STORE,
+    SUPPORTED_LANGUAGES,
     RoomState,
     build_js_execution_iframe,
     generate_room_id,
@@ -54,6 +57,17 @@ def test_rooms_store_get_or_create_and_update() -> None:
     assert again.language == "python"
 
 
+def test_normalize_language_returns_interned_ids() -> None:
+    # Built at runtime, so it is a different object from the literal
+    key = "".join(["py", "thon"])
+    assert normalize_language(key) is normalize_language("Python")
+
+
+def test_supported_languages_is_read_only() -> None:
+    with pytest.raises(TypeError):
+        SUPPORTED_LANGUAGES["Rust"] = "rust"  # type: ignore[index]
+
+
 def test_build_js_execution_iframe_contains_sandbox_and_escaped_code() -> None:
     user_code = "console.log('hello <world>');"
     iframe_html = build_js_execution_iframe(user_code)
@@ -62,6 +76,22 @@ def test_build_js_execution_iframe_contains_sandbox_and_escaped_code() -> None:
     assert "<iframe" in iframe_html
     assert 'sandbox="allow-scripts"' in iframe_html
 
-    # The inner HTML is escaped inside srcdoc
-    escaped_snippet = html.escape("console.log('hello <world>');", quote=True)
-    assert escaped_snippet in iframe_html
+    # The code is attribute-escaped inside the onload handler
+    assert "postMessage(&quot;console.log('hello <world>');&quot;, '*')" in iframe_html
+
+
+def test_build_js_execution_iframe_escapes_ampersands_and_quotes() -> None:
+    iframe_html = build_js_execution_iframe('if (a && b) console.log("&quot;");')
+
+    assert 'if (a &amp;&amp; b) console.log(\\&quot;&amp;quot;\\&quot;);' in iframe_html
+
+
+def test_build_js_execution_iframe_posts_code_into_constant_sandbox() -> None:
+    srcdoc = re.compile(r'srcdoc="([^"]*)"')
+    first = build_js_execution_iframe("console.log(1);")
+    second = build_js_execution_iframe("console.log('</script>');")
+
+    # The sandbox document never embeds the user code; it is posted in onload
+    assert srcdoc.search(first).group(1) == srcdoc.search(second).group(1)  # type: ignore[union-attr]
+    assert "</script>" not in srcdoc.search(second).group(1)  # type: ignore[union-attr]
+    assert "postMessage(" in second
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+# main.py imports its siblings as top-level modules, like `streamlit run` does
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "app_frontend"))
+
+import main as frontend_main  # noqa: E402
+
+
+def _poll_vanished_room() -> None:
+    import streamlit as st
+
+    import main
+
+    # A poll of a vanished room may ask for an app rerun; bound those
+    runs = st.session_state.get("runs", 0) + 1
+    st.session_state["runs"] = runs
+    if runs > 10:
+        return
+
+    ess = main.get_editor_state()
+    ess.room = {"room_id": "gone-room", "code": "", "language": "python", "last_updated": 1.0}
+    ess.next_poll_at = 0.0  # the timed poll is due
+    main.render_editor_panel("gone-room", "python", "python", main.MIN_POLL_INTERVAL)
+
+
+def test_polling_a_vanished_room_does_not_create_rooms(monkeypatch: pytest.MonkeyPatch) -> None:
+    created: List[Dict[str, Any]] = []
+
+    def fake_get_room(room_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def fake_create_room(code: str = "", language: str = "python") -> Dict[str, Any]:
+        room = {
+            "room_id": f"new-{len(created)}",
+            "code": code,
+            "language": language,
+            "last_updated": 2.0 + len(created),
+        }
+        created.append(room)
+        return room
+
+    monkeypatch.setattr(frontend_main, "get_room", fake_get_room)
+    monkeypatch.setattr(frontend_main, "create_room", fake_create_room)
+
+    at = AppTest.from_function(_poll_vanished_room, default_timeout=20)
+    # Each run stands in for one timed rerun of the editor panel
+    for _ in range(5):
+        at.run()
+        assert not at.exception
+
+    # Replacing the room is left to the full app run, which also updates ?room=
+    assert len(created) <= 1
@@ -1,19 +1,34 @@
 from __future__ import annotations
 
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
 from src.app_backend.main import app
 
 
-def test_openapi_basic_structure() -> None:
+@pytest.fixture(scope="module")
+def openapi() -> SimpleNamespace:
+    """Build the schema once per module and pre-extract the parts tests walk."""
     schema = app.openapi()
+    return SimpleNamespace(
+        schema=schema,
+        paths=schema["paths"],
+        schemas=schema["components"]["schemas"],
+    )
+
+
+def test_openapi_basic_structure(openapi: SimpleNamespace) -> None:
+    schema = openapi.schema
     assert schema["openapi"].startswith("3."), "OpenAPI version should be 3.x"
     info = schema["info"]
     assert info["title"] == "Collaborative Code App API"
     assert info["version"] == "0.1.0"
 
 
-def test_openapi_has_expected_paths() -> None:
-    schema = app.openapi()
-    paths = schema["paths"]
+def test_openapi_has_expected_paths(openapi: SimpleNamespace) -> None:
+    paths = openapi.paths
 
     # Health endpoint
     assert "/health" in paths
@@ -32,9 +47,8 @@ def test_openapi_has_expected_paths() -> None:
     assert "patch" in single
 
 
-def test_openapi_room_create_response_schema_ref() -> None:
-    schema = app.openapi()
-    post_rooms = schema["paths"]["/rooms"]["post"]
+def test_openapi_room_create_response_schema_ref(openapi: SimpleNamespace) -> None:
+    post_rooms = openapi.paths["/rooms"]["post"]
     responses = post_rooms["responses"]
 
     # 201 response should use RoomCreateResponse schema
@@ -44,10 +58,8 @@ def test_openapi_room_create_response_schema_ref() -> None:
     assert content["$ref"] == "#/components/schemas/RoomCreateResponse"
 
 
-def test_openapi_components_include_room_schemas() -> None:
-    schema = app.openapi()
-    components = schema["components"]
-    schemas = components["schemas"]
+def test_openapi_components_include_room_schemas(openapi: SimpleNamespace) -> None:
+    schemas = openapi.schemas
 
     # All our key models should be present
     expected = {
@@ -71,3 +83,9 @@ def test_openapi_components_include_room_schemas() -> None:
     assert "language" in props
     assert "last_updated" in props
     assert props["last_updated"]["type"] in {"number", "integer"}
+
+
+def test_openapi_schema_is_built_at_startup() -> None:
+    app.openapi_schema = None
+    with TestClient(app):
+        assert app.openapi_schema is not None